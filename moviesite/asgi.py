@@ -9,8 +9,11 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from moviesite.staticfiles import StaticFilesASGI
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviesite.settings')
 
-application = get_asgi_application()
+application = StaticFilesASGI(get_asgi_application(), settings.STATIC_ROOT, settings.STATIC_URL)
@@ -25,6 +25,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'reviews.middleware.RenamedAuthBackendMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -58,6 +59,32 @@ DATABASES = {
     }
 }
 
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+# Each gunicorn worker has its own LocMemCache, so a logout or deactivation
+# handled by one worker would not reach the others. Sessions and users are
+# only cached when the cache is shared between workers (Redis, Memcached...).
+SHARED_CACHE = CACHE_BACKEND not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Session storage: 'cached_db' (write-through cache), 'cache', 'signed_cookies' or 'db'
+SESSION_MODE = os.environ.get('DJANGO_SESSION_MODE', 'cached_db' if SHARED_CACHE else 'db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_MODE}'
+
+# Flash messages travel in a cookie so pages without messages never load the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+AUTHENTICATION_BACKENDS = ['reviews.backends.CachedModelBackend']
+# Seconds CachedModelBackend keeps session users cached; None disables it
+USER_CACHE_TIMEOUT = 300 if SHARED_CACHE else None
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -74,6 +101,15 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed, gzip/brotli-compressed copies that the
+# WSGI/ASGI wrappers in moviesite.staticfiles serve with immutable caching.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'moviesite.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
+TEST_RUNNER = 'moviesite.test_runner.TestRunner'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
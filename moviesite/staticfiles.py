@@ -0,0 +1,230 @@
+"""
+Fingerprinted, precompressed static files served straight from the app server.
+
+``collectstatic`` writes content-hashed copies of every asset plus ``.gz``
+and ``.br`` variants; ``StaticFilesWSGI`` / ``StaticFilesASGI`` serve them
+with a one-year immutable ``Cache-Control`` so gunicorn/uvicorn can handle
+static traffic without a separate web server.
+"""
+
+import asyncio
+import gzip
+import json
+import mimetypes
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html'}
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+CHUNK_SIZE = 64 * 1024
+
+# Preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def accepted_encodings(accept_encoding):
+    """Return the content codings an Accept-Encoding header allows, i.e. with q > 0."""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    wildcard = qualities.pop('*', 0.0)
+    return {coding for coding, _ in ENCODINGS if qualities.get(coding, wildcard) > 0}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes gzip and brotli variants."""
+
+    @property
+    def manifest_strict(self):
+        # In development assets are usually not collected; fall back to the
+        # unhashed name there, but fail loudly in production.
+        return not settings.DEBUG
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.manifest_strict:
+                raise
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if Path(name).suffix in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+
+        for suffix, compressed in variants.items():
+            # A variant that is not smaller is just wasted bytes on the wire
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+class StaticFileIndex:
+    """In-memory map of URL path -> file variants, built once at startup."""
+
+    def __init__(self, root, prefix):
+        self.prefix = '/' + prefix.strip('/') + '/'
+        self.files = {}
+        root = Path(root)
+        if not root.is_dir():
+            return
+
+        immutable = set()
+        manifest = root / ManifestStaticFilesStorage.manifest_name
+        if manifest.is_file():
+            immutable = set(json.loads(manifest.read_text()).get('paths', {}).values())
+
+        compressed_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for path in root.rglob('*'):
+            if not path.is_file() or path.name.endswith(compressed_suffixes):
+                continue
+            name = path.relative_to(root).as_posix()
+            self.files[self.prefix + name] = self._entry(path, name in immutable)
+
+    def _entry(self, path, immutable):
+        content_type, _ = mimetypes.guess_type(path.name)
+        if content_type is None:
+            content_type = 'application/octet-stream'
+        elif content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+
+        stat = path.stat()
+        variants = {None: (str(path), stat.st_size)}
+        for encoding, suffix in ENCODINGS:
+            compressed = Path(str(path) + suffix)
+            if compressed.is_file():
+                variants[encoding] = (str(compressed), compressed.stat().st_size)
+
+        headers = [
+            ('Content-Type', content_type),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('ETag', f'W/"{int(stat.st_mtime):x}-{stat.st_size:x}"'),
+        ]
+        if len(variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+        return headers, variants
+
+    def lookup(self, method, path, accept_encoding, if_none_match):
+        """Return (status, headers, file path or None), or None to fall through."""
+        if not path.startswith(self.prefix) or path not in self.files:
+            return None
+        headers, variants = self.files[path]
+        if method not in ('GET', 'HEAD'):
+            return '405 Method Not Allowed', [('Allow', 'GET, HEAD')], None
+
+        etag = next(value for key, value in headers if key == 'ETag')
+        if if_none_match and etag in if_none_match:
+            return '304 Not Modified', [h for h in headers if h[0] in ('Cache-Control', 'ETag', 'Vary')], None
+
+        accepted = accepted_encodings(accept_encoding)
+        encoding = next((e for e, _ in ENCODINGS if e in variants and e in accepted), None)
+        file_path, size = variants[encoding]
+        headers = headers + [('Content-Length', str(size))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        return '200 OK', headers, (file_path if method == 'GET' else None)
+
+
+class StaticFilesWSGI:
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.index = StaticFileIndex(root, prefix)
+
+    def __call__(self, environ, start_response):
+        result = self.index.lookup(
+            environ['REQUEST_METHOD'],
+            environ.get('PATH_INFO', ''),
+            environ.get('HTTP_ACCEPT_ENCODING', ''),
+            environ.get('HTTP_IF_NONE_MATCH', ''),
+        )
+        if result is None:
+            return self.application(environ, start_response)
+
+        status, headers, file_path = result
+        start_response(status, headers)
+        if file_path is None:
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(open(file_path, 'rb'), CHUNK_SIZE)
+        return self._read_chunks(file_path)
+
+    @staticmethod
+    def _read_chunks(file_path):
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+
+class StaticFilesASGI:
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.index = StaticFileIndex(root, prefix)
+
+    async def __call__(self, scope, receive, send):
+        result = None
+        if scope['type'] == 'http':
+            request_headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+            result = self.index.lookup(
+                scope['method'],
+                scope['path'],
+                request_headers.get('accept-encoding', ''),
+                request_headers.get('if-none-match', ''),
+            )
+        if result is None:
+            return await self.application(scope, receive, send)
+
+        status, headers, file_path = result
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split()[0]),
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        })
+        if file_path is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        # Disk reads run in a thread so a large asset does not stall the event loop
+        f = await asyncio.to_thread(open, file_path, 'rb')
+        try:
+            while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            f.close()
+        await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner that serves unhashed static names.
+
+    Tests run with DEBUG=False and without collectstatic, so the manifest
+    storage would refuse every {% static %} tag. Tests of the static pipeline
+    override STORAGES back to the manifest storage.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._storages = override_settings(STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        self._storages.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._storages.disable()
+        super().teardown_test_environment(**kwargs)
@@ -9,8 +9,11 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from moviesite.staticfiles import StaticFilesWSGI
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviesite.settings')
 
-application = get_wsgi_application()
+application = StaticFilesWSGI(get_wsgi_application(), settings.STATIC_ROOT, settings.STATIC_URL)
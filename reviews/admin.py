@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Movie, Rating, Review, Comment
+from .models import UserProfile, Movie, Rating, Review, Comment, MovieSimilarity, UserStats, Job
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -22,7 +22,7 @@ class RatingAdmin(admin.ModelAdmin):
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ['title', 'user', 'movie', 'created_at']
+    list_display = ['title', 'user', 'movie', 'comment_count', 'created_at']
     search_fields = ['title', 'content', 'user__username', 'movie__title']
     list_filter = ['created_at', 'updated_at']
     date_hierarchy = 'created_at'
@@ -31,4 +31,22 @@ class ReviewAdmin(admin.ModelAdmin):
 class CommentAdmin(admin.ModelAdmin):
     list_display = ['user', 'review', 'created_at']
     search_fields = ['content', 'user__username']
-    list_filter = ['created_at']
\ No newline at end of file
+    list_filter = ['created_at']
+
+@admin.register(MovieSimilarity)
+class MovieSimilarityAdmin(admin.ModelAdmin):
+    list_display = ['movie', 'updated_at']
+    search_fields = ['movie__title']
+    readonly_fields = ['movie', 'neighbor_ids', 'scores', 'source_hash', 'updated_at']
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'rating_count', 'review_count', 'comment_count', 'last_activity']
+    search_fields = ['user__username']
+    readonly_fields = ['rating_count', 'rating_sum', 'genre_counts', 'review_count', 'comment_count', 'last_activity']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'key', 'status', 'attempts', 'created_at', 'finished_at']
+    search_fields = ['kind', 'key']
+    list_filter = ['kind', 'status']
\ No newline at end of file
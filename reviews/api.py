@@ -0,0 +1,80 @@
+"""
+REST API views.
+
+Kept out of views.py so that importing the HTML views does not load the DRF
+stack; reviews/urls.py imports this module on the first API request.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Avg
+from django.shortcuts import get_object_or_404
+from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.pagination import CursorPagination
+from . import jobs, stats
+from .models import Movie, Rating, Review
+from .serializers import MovieSerializer, RatingSerializer, ReviewSerializer, CommentSerializer, UserStatsSerializer
+
+
+class MovieListAPI(generics.ListCreateAPIView):
+    queryset = Movie.objects.all()
+    serializer_class = MovieSerializer
+
+
+class MovieDetailAPI(generics.RetrieveAPIView):
+    queryset = Movie.objects.all()
+    serializer_class = MovieSerializer
+
+
+class RatingListAPI(generics.ListCreateAPIView):
+    queryset = Rating.objects.all()
+    serializer_class = RatingSerializer
+
+
+class ReviewListAPI(generics.ListCreateAPIView):
+    queryset = Review.objects.all()
+    serializer_class = ReviewSerializer
+
+
+class CommentCursorPagination(CursorPagination):
+    page_size = 20
+    ordering = 'id'
+
+
+class ReviewCommentListAPI(generics.ListAPIView):
+    serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
+
+    def get_queryset(self):
+        review = get_object_or_404(Review, pk=self.kwargs['review_id'])
+        comments = review.comments.select_related('user')
+        # Lets movie_detail continue after the comments it already rendered
+        after = self.request.query_params.get('after')
+        if after and after.isdigit():
+            comments = comments.filter(id__gt=after)
+        return comments
+
+
+class UserStatsAPI(generics.RetrieveAPIView):
+    serializer_class = UserStatsSerializer
+
+    def get_object(self):
+        user = get_object_or_404(User, pk=self.kwargs['user_id'])
+        return stats.for_user(user)
+
+
+@api_view(['GET'])
+def top_rated_api(request):
+    movies = Movie.objects.annotate(
+        avg_rating=Avg('ratings__rating')
+    ).order_by('-avg_rating')[:10]
+
+    serializer = MovieSerializer(movies, many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def job_metrics_api(request):
+    return Response(jobs.metrics())
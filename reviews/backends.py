@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+UserModel = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f'reviews:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that keeps session users (with their profile) in the cache.
+
+    Entries are dropped by the User/UserProfile save and delete signals.
+    Caching is off when ``USER_CACHE_TIMEOUT`` is None.
+    """
+
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        key = user_cache_key(user_id)
+        user = cache.get(key) if timeout else None
+        if user is None:
+            try:
+                user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if timeout:
+                cache.set(key, user, timeout)
+        return user if self.user_can_authenticate(user) else None
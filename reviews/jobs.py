@@ -0,0 +1,217 @@
+"""
+Database-backed job queue for derived data.
+
+Model signals call ``enqueue`` for work too expensive to do inline: similar
+movie lists and user stats rebuilds. Repeated enqueues of the same
+(kind, key) collapse into one pending row, and
+``manage.py run_workers`` hands each kind's handler a whole batch of keys at
+once, so a burst of writes for one user or movie costs a single recompute.
+Kinds registered with a ``delay`` wait that long before they are due, so the
+burst has time to collapse; ``exclusive`` kinds run one batch at a time.
+"""
+import os
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min
+from django.utils import timezone
+
+from . import stats
+from .models import Job, JobLock
+
+MAX_ATTEMPTS = 5
+BATCH_SIZE = 100
+# Finished jobs are kept this long for the latency/throughput metrics
+METRICS_WINDOW = timedelta(hours=1)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+# A running job whose worker has not sent a heartbeat for this long is presumed dead
+STALE_AFTER = timedelta(minutes=2)
+
+HANDLERS = {}
+DELAYS = {}
+EXCLUSIVE_KINDS = set()
+
+
+def handler(kind, delay=None, exclusive=False):
+    """Register ``func(keys)`` as the processor for jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        if delay:
+            DELAYS[kind] = delay
+        if exclusive:
+            EXCLUSIVE_KINDS.add(kind)
+        return func
+    return register
+
+
+def enqueue(kind, key):
+    run_after = timezone.now() + DELAYS.get(kind, timedelta(0))
+    Job.objects.bulk_create([Job(kind=kind, key=str(key), run_after=run_after)], ignore_conflicts=True)
+
+
+def _claim(kind, worker, batch_size):
+    if kind not in EXCLUSIVE_KINDS:
+        return _claim_pending(kind, worker, batch_size)
+    with transaction.atomic():
+        JobLock.objects.get_or_create(kind=kind)
+        # Writing the sentinel row serialises claims of this kind across workers
+        JobLock.objects.filter(kind=kind).update(claimed_at=timezone.now())
+        if Job.objects.filter(kind=kind, status=Job.RUNNING).exists():
+            return []
+        return _claim_pending(kind, worker, batch_size)
+
+
+def _claim_pending(kind, worker, batch_size):
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(kind=kind, status=Job.PENDING, run_after__lte=now)
+        .order_by('created_at').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    # The status filter makes the claim safe against other workers racing for the same rows
+    Job.objects.filter(pk__in=ids, status=Job.PENDING).update(
+        status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(pk__in=ids, status=Job.RUNNING, worker=worker))
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes ``heartbeat_at`` on claimed jobs while their handler runs."""
+
+    def __init__(self, job_ids, worker, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.job_ids = job_ids
+        self.worker = worker
+        self.interval = interval.total_seconds()
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Job.objects.filter(pk__in=self.job_ids, status=Job.RUNNING, worker=self.worker).update(
+                    heartbeat_at=timezone.now(),
+                )
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _retry(job, error):
+    job.last_error = error
+    job.finished_at = timezone.now()
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = Job.FAILED
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+        return
+    job.status = Job.PENDING
+    job.worker = ''
+    job.run_after = job.finished_at + timedelta(seconds=2 ** job.attempts)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'worker', 'last_error', 'finished_at', 'run_after'])
+    except IntegrityError:
+        # A newer pending job for the same key was enqueued meanwhile and covers this one
+        job.delete()
+
+
+def run_batch(kind, worker=None, batch_size=BATCH_SIZE):
+    """Claim and process up to ``batch_size`` pending jobs of ``kind``; return how many were claimed."""
+    worker = worker or f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    jobs = _claim(kind, worker, batch_size)
+    if not jobs:
+        return 0
+
+    heartbeat = _Heartbeat([job.pk for job in jobs], worker)
+    heartbeat.start()
+    try:
+        HANDLERS[kind](sorted({job.key for job in jobs}))
+    except Exception:
+        error = traceback.format_exc()
+        for job in jobs:
+            _retry(job, error)
+    else:
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.DONE, finished_at=timezone.now(), last_error='',
+        )
+    finally:
+        heartbeat.stop()
+    return len(jobs)
+
+
+def run_pending(batch_size=BATCH_SIZE, worker=None):
+    """Process every due job of every kind until none are left; return the number processed."""
+    processed = 0
+    while True:
+        claimed = sum(run_batch(kind, worker, batch_size) for kind in HANDLERS)
+        if not claimed:
+            return processed
+        processed += claimed
+
+
+def prune(older_than=METRICS_WINDOW):
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - older_than).delete()[0]
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Put jobs left RUNNING by a dead worker back on the queue; return how many there were."""
+    stale = list(Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=timezone.now() - older_than))
+    for job in stale:
+        _retry(job, f'Worker {job.worker} sent no heartbeat for {older_than}.')
+    return len(stale)
+
+
+def _empty_metrics():
+    return {
+        'pending': 0, 'running': 0, 'failed': 0, 'done': 0,
+        'oldest_pending_seconds': None, 'mean_latency_seconds': None, 'jobs_per_minute': 0.0,
+    }
+
+
+def metrics(window=METRICS_WINDOW):
+    """Per-kind queue depth, failures, enqueue-to-finish latency and throughput over the last ``window``."""
+    now = timezone.now()
+    result = {kind: _empty_metrics() for kind in HANDLERS}
+
+    queued = Job.objects.exclude(status=Job.DONE).order_by().values('kind', 'status').annotate(
+        n=Count('pk'), oldest=Min('created_at'),
+    )
+    for row in queued:
+        entry = result.setdefault(row['kind'], _empty_metrics())
+        entry[row['status']] = row['n']
+        if row['status'] == Job.PENDING:
+            entry['oldest_pending_seconds'] = round((now - row['oldest']).total_seconds(), 3)
+
+    finished = Job.objects.filter(status=Job.DONE, finished_at__gte=now - window).order_by().values('kind').annotate(
+        n=Count('pk'),
+        latency=Avg(ExpressionWrapper(F('finished_at') - F('created_at'), output_field=DurationField())),
+    )
+    for row in finished:
+        entry = result.setdefault(row['kind'], _empty_metrics())
+        entry['done'] = row['n']
+        entry['jobs_per_minute'] = round(row['n'] / (window.total_seconds() / 60), 2)
+        if row['latency'] is not None:
+            entry['mean_latency_seconds'] = round(row['latency'].total_seconds(), 3)
+    return result
+
+
+@handler('user_stats')
+def rebuild_user_stats(keys):
+    stats.rebuild([int(key) for key in keys])
+
+
+# A run re-vectorizes the whole catalogue (minutes at 50k movies), so a burst
+# of review writes waits out the delay and collapses into one run, and runs
+# never overlap.
+@handler('similar_movies', delay=timedelta(minutes=5), exclusive=True)
+def rebuild_similar_movies(keys):
+    # Keys are the changed movie ids, but one incremental rebuild finds every
+    # changed movie by its source hash. Imported here to keep NumPy out of web workers.
+    from . import similarity
+    similarity.rebuild()
@@ -0,0 +1,69 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from reviews.models import Movie
+
+BASELINE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request query counts on home and movie_detail between the '
+        'default database session/auth setup and the configured one. All data '
+        'written by the run is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Requests per page and mode.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user('benchmark-request-queries', password=None)
+            movie = Movie.objects.create(
+                title='Benchmark', description='Benchmark movie', genre='drama',
+                director='Benchmark', release_date=datetime.date(2000, 1, 1),
+            )
+            pages = [('home', reverse('home')), ('movie_detail', reverse('movie_detail', args=[movie.pk]))]
+
+            with override_settings(**BASELINE):
+                baseline = self.measure(user, pages, options['requests'])
+            configured = self.measure(user, pages, options['requests'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'page':<14}{'visitor':<11}{'db backend':>12}{'configured':>12}{'saved':>8}")
+        for key in baseline:
+            saved = baseline[key] - configured[key]
+            self.stdout.write(f'{key[0]:<14}{key[1]:<11}{baseline[key]:>12.1f}{configured[key]:>12.1f}{saved:>8.1f}')
+
+    def measure(self, user, pages, requests):
+        # A private cache starts every mode cold without flushing the shared one
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'benchmark-request-queries-{uuid.uuid4().hex}',
+        }}):
+            return self._measure(user, pages, requests)
+
+    def _measure(self, user, pages, requests):
+        visitors = {'anonymous': Client(), 'logged-in': Client()}
+        visitors['logged-in'].force_login(user)
+
+        results = {}
+        for name, url in pages:
+            for visitor, client in visitors.items():
+                client.get(url)  # warm caches
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(requests):
+                        client.get(url)
+                results[name, visitor] = len(queries) / requests
+        return results
@@ -0,0 +1,94 @@
+import datetime
+import string
+import time
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import similarity
+from reviews.models import Movie, Review
+
+
+def synthetic_word(i):
+    # Letters only: the tokenizer drops digits
+    letters = []
+    while True:
+        i, rest = divmod(i, 26)
+        letters.append(string.ascii_lowercase[rest])
+        if not i:
+            break
+    return 'zq' + ''.join(letters)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time similarity.rebuild() on a synthetic catalogue: a full build, a no-op '
+        'pass and an incremental pass after editing some movies. All data written '
+        'by the run is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=50000)
+        parser.add_argument('--words', type=int, default=120, help='Tokens per synthetic description.')
+        parser.add_argument('--reviews', type=int, default=2, help='Reviews per movie.')
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--changed', type=int, default=500, help='Movies edited before the incremental pass.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        vocabulary = [synthetic_word(i) for i in range(options['vocabulary'])]
+        genres = [choice for choice, _ in Movie.GENRE_CHOICES]
+
+        # Zipf-like word frequencies, closer to real text than a uniform draw
+        weights = 1 / np.arange(1, len(vocabulary) + 1)
+        weights /= weights.sum()
+
+        def text(n_words):
+            return ' '.join(vocabulary[w] for w in rng.choice(len(vocabulary), size=n_words, p=weights))
+
+        with transaction.atomic():
+            user = User.objects.create_user('benchmark-similar-movies', password=None)
+            movies = Movie.objects.bulk_create([
+                Movie(
+                    title=f'Movie {i}', description=text(options['words']), genre=genres[i % len(genres)],
+                    director=f'Director {i % 5000}', release_date=datetime.date(2000, 1, 1),
+                )
+                for i in range(options['movies'])
+            ], batch_size=1000)
+            Review.objects.bulk_create([
+                Review(movie=movie, user=user, title='Review', content=text(options['words'] // 2))
+                for movie in movies for _ in range(options['reviews'])
+            ], batch_size=1000)
+
+            started = time.perf_counter()
+            full = similarity.rebuild()
+            full_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            similarity.rebuild()
+            noop_seconds = time.perf_counter() - started
+
+            changed = [movies[i] for i in rng.choice(len(movies), size=min(options['changed'], len(movies)), replace=False)]
+            for movie in changed:
+                movie.description = text(options['words'])
+            Movie.objects.bulk_update(changed, ['description'], batch_size=1000)
+            started = time.perf_counter()
+            incremental = similarity.rebuild()
+            incremental_seconds = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        tokens = set(vocabulary) | {f'director=director_{i}' for i in range(5000)} | {f'genre={g}' for g in genres}
+        columns = set(similarity._columns(sorted(tokens), similarity.N_FEATURES).tolist())
+
+        self.stdout.write(f'movies:              {full["movies"]}')
+        self.stdout.write(f'hashed features:     {similarity.N_FEATURES}')
+        self.stdout.write(f'colliding tokens:    {1 - len(columns) / len(tokens):.2%} of {len(tokens)}')
+        self.stdout.write(f'rebuild (full):      {full_seconds:.2f}s, {full["rebuilt"]} lists')
+        self.stdout.write(f'rebuild (no-op):     {noop_seconds:.2f}s')
+        self.stdout.write(
+            f'rebuild ({len(changed)} edited): {incremental_seconds:.2f}s, {incremental["rebuilt"]} lists'
+        )
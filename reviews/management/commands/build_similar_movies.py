@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from reviews import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the "More Like This" neighbour lists. By default only movies whose '
+        'description, director, genre or reviews changed since the last run are '
+        'recomputed; use --full periodically to refresh every list.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute neighbours for every movie.')
+        parser.add_argument('--top-k', type=int, default=similarity.TOP_K, help='Neighbours stored per movie.')
+
+    def handle(self, *args, **options):
+        result = similarity.rebuild(full=options['full'], k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt similar movies for {result['rebuilt']} of {result['movies']} movies."
+        ))
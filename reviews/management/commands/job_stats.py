@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews import jobs
+
+
+class Command(BaseCommand):
+    help = 'Show queue depth, failures, latency and throughput of background jobs.'
+
+    def handle(self, *args, **options):
+        header = f"{'kind':<16}{'pending':>9}{'running':>9}{'failed':>8}{'done':>8}{'oldest s':>10}{'latency s':>11}{'per min':>9}"
+        self.stdout.write(header)
+        for kind, m in sorted(jobs.metrics().items()):
+            oldest = '-' if m['oldest_pending_seconds'] is None else f"{m['oldest_pending_seconds']:.1f}"
+            latency = '-' if m['mean_latency_seconds'] is None else f"{m['mean_latency_seconds']:.2f}"
+            self.stdout.write(
+                f"{kind:<16}{m['pending']:>9}{m['running']:>9}{m['failed']:>8}{m['done']:>8}"
+                f"{oldest:>10}{latency:>11}{m['jobs_per_minute']:>9}"
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reviews import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user activity stats from ratings, reviews and comments (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Only rebuild these users (default: all).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = stats.rebuild(options['user_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} users.'))
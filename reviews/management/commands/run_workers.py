@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from reviews import jobs
+
+
+def work(batch_size, poll_interval, once):
+    # Connections inherited from the parent process must not be shared
+    connections.close_all()
+    worker = f'{os.uname().nodename}-{os.getpid()}'
+    while True:
+        processed = jobs.run_pending(batch_size=batch_size, worker=worker)
+        if once:
+            return
+        if not processed:
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Process queued derived-data jobs (user stats, similar movies) with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=jobs.BATCH_SIZE, help='Jobs handed to a handler at once.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling.')
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale()
+        pruned = jobs.prune()
+        if requeued or pruned:
+            self.stdout.write(f'Requeued {requeued} stale jobs, pruned {pruned} finished jobs.')
+
+        work_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['processes'] <= 1:
+            work(*work_args)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=work_args, daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} workers.")
+
+        try:
+            while any(process.is_alive() for process in processes):
+                for process in processes:
+                    process.join(timeout=60)
+                if not options['once']:
+                    jobs.requeue_stale()
+                    jobs.prune()
+        except KeyboardInterrupt:
+            for process in processes:
+                os.kill(process.pid, signal.SIGTERM)
+            for process in processes:
+                process.join()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from reviews.startup import profile_startup
+
+
+class Command(BaseCommand):
+    help = 'Report cumulative import time and RSS growth per module for a cold start of the WSGI application.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=30, help='Number of modules to list.')
+        parser.add_argument('--sort', choices=['time', 'rss'], default='time')
+        parser.add_argument('--filter', default='', help='Only list modules whose name starts with this prefix.')
+
+    def handle(self, *args, **options):
+        profile = profile_startup()
+        key = 'cumulative_us' if options['sort'] == 'time' else 'rss_kb'
+        modules = sorted(
+            ((name, stats) for name, stats in profile['modules'].items() if name.startswith(options['filter'])),
+            key=lambda item: item[1][key],
+            reverse=True,
+        )
+
+        self.stdout.write(f"{'cumulative ms':>14}{'self ms':>10}{'rss KiB':>10}  module")
+        for name, stats in modules[:options['limit']]:
+            self.stdout.write(
+                f"{stats['cumulative_us'] / 1000:>14.1f}{stats['self_us'] / 1000:>10.1f}{stats['rss_kb']:>10}  {name}"
+            )
+        self.stdout.write('')
+        self.stdout.write(
+            f"{len(profile['modules'])} modules, {profile['seconds'] * 1000:.0f} ms, "
+            f"{profile['rss_kb'] / 1024:.1f} MiB RSS after start-up"
+        )
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+
+# Authentication backends that were replaced, mapped to their successor.
+# Sessions naming one are moved over on their next request instead of being
+# logged out; entries can go once SESSION_COOKIE_AGE has passed since the
+# replacement was deployed.
+RENAMED_AUTH_BACKENDS = {
+    'django.contrib.auth.backends.ModelBackend': 'reviews.backends.CachedModelBackend',
+}
+
+
+class RenamedAuthBackendMiddleware:
+    """Point sessions at the current backend when theirs was renamed.
+
+    Must come after SessionMiddleware and before AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Without a session cookie there is nothing to migrate, so skip loading the session
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            backend = request.session.get(BACKEND_SESSION_KEY)
+            replacement = RENAMED_AUTH_BACKENDS.get(backend)
+            if replacement and backend not in settings.AUTHENTICATION_BACKENDS:
+                request.session[BACKEND_SESSION_KEY] = replacement
+        return self.get_response(request)
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieSimilarity',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='reviews.movie')),
+                ('neighbor_ids', models.BinaryField()),
+                ('scores', models.BinaryField()),
+                ('source_hash', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'movie similarities',
+            },
+        ),
+    ]
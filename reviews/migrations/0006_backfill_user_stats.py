@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-19 19:02
+
+from django.db import migrations
+
+
+def schedule_user_stats(apps, schema_editor):
+    # Users who were active before UserStats existed get a rebuild from the
+    # user_stats job instead of showing zeros until their next write.
+    User = apps.get_model('auth', 'User')
+    Job = apps.get_model('reviews', 'Job')
+    missing = User.objects.filter(stats__isnull=True).values_list('pk', flat=True)
+    Job.objects.bulk_create(
+        [Job(kind='user_stats', key=str(pk)) for pk in missing.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_user_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
+from array import array
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import Avg
+from django.utils import timezone
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -52,6 +55,13 @@ class Rating(models.Model):
     class Meta:
         unique_together = ('movie', 'user')
         ordering = ['-created_at']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the stats signal apply the difference when a rating is changed
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
     
     def __str__(self):
         return f'{self.user.username} - {self.movie.title}: {self.rating}/10'
@@ -61,6 +71,8 @@ class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Kept in sync by the Comment signals in reviews/signals.py
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -80,4 +92,102 @@ class Comment(models.Model):
         ordering = ['created_at']
     
     def __str__(self):
-        return f'{self.user.username} on {self.review.title}'
\ No newline at end of file
+        return f'{self.user.username} on {self.review.title}'
+
+class MovieSimilarity(models.Model):
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='similarity')
+    neighbor_ids = models.BinaryField()
+    scores = models.BinaryField()
+    source_hash = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'movie similarities'
+
+    def __str__(self):
+        return f'Similar to {self.movie_id}'
+
+    def neighbor_id_list(self):
+        return array('q', bytes(self.neighbor_ids)).tolist()
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # {genre: number of ratings}
+    genre_counts = models.JSONField(default=dict)
+    review_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+
+    def __str__(self):
+        return f'{self.user_id} stats'
+
+    def mean_rating(self):
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0
+
+    def genre_distribution(self):
+        labels = dict(Movie.GENRE_CHOICES)
+        return sorted(
+            ((labels.get(genre, genre), count) for genre, count in self.genre_counts.items() if count),
+            key=lambda item: -item[1],
+        )
+
+
+class Job(models.Model):
+    """A unit of derived-data maintenance, processed by ``manage.py run_workers``."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    key = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; see jobs.requeue_stale
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            # At most one pending job per (kind, key): repeated enqueues coalesce
+            models.UniqueConstraint(
+                fields=['kind', 'key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_job',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'kind', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.key} ({self.status})'
+
+
+class JobLock(models.Model):
+    """Sentinel row per job kind that may only run one batch at a time."""
+
+    kind = models.CharField(max_length=50, primary_key=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.kind
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Movie, Rating, Review, Comment
+from .models import Movie, Rating, Review, Comment, UserStats
 
 class MovieSerializer(serializers.ModelSerializer):
     average_rating = serializers.SerializerMethodField()
@@ -26,11 +26,19 @@ class ReviewSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Review
-        fields = ['id', 'movie', 'user', 'title', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'movie', 'user', 'title', 'content', 'comment_count', 'created_at', 'updated_at']
 
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField()
     
     class Meta:
         model = Comment
-        fields = ['id', 'review', 'user', 'content', 'created_at']
\ No newline at end of file
+        fields = ['id', 'review', 'user', 'content', 'created_at']
+
+class UserStatsSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField()
+    mean_rating = serializers.FloatField()
+
+    class Meta:
+        model = UserStats
+        fields = ['user', 'rating_count', 'mean_rating', 'genre_counts', 'review_count', 'comment_count', 'last_activity']
\ No newline at end of file
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import jobs, stats
+from .backends import invalidate_cached_user
+from .models import Comment, Movie, Rating, Review, UserProfile
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Review.objects.filter(pk=instance.review_id).update(comment_count=F('comment_count') + 1)
+
+
+def _cascaded(sender, origin):
+    """Whether a row was deleted by a cascade rather than by its own delete()."""
+    return origin is not None and not isinstance(origin, sender) and getattr(origin, 'model', None) is not sender
+
+
+def _rebuild_stats_after_cascade(user_id, origin):
+    # One rebuild per user however many of their rows the cascade removes,
+    # instead of a locked delta per row. A deleted user takes their stats along.
+    scheduled = origin.__dict__.setdefault('_user_stats_scheduled', set())
+    if user_id in scheduled or (isinstance(origin, User) and origin.pk == user_id):
+        return
+    scheduled.add(user_id)
+    jobs.enqueue('user_stats', user_id)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Review, Movie)):
+        return  # the review goes too
+    Review.objects.filter(pk=instance.review_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    stats.rating_saved(instance, created)
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded(sender, origin):
+        _rebuild_stats_after_cascade(instance.user_id, origin)
+    else:
+        stats.rating_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Comment)
+def activity_counted(sender, instance, created=None, origin=None, **kwargs):
+    if created is False:
+        return
+    if created is None and _cascaded(sender, origin):
+        _rebuild_stats_after_cascade(instance.user_id, origin)
+        return
+    field = 'review_count' if sender is Review else 'comment_count'
+    stats.counter_changed(instance.user_id, field, 1 if created else -1)
+
+
+@receiver([post_save, post_delete], sender=Movie)
+@receiver([post_save, post_delete], sender=Review)
+def enqueue_similar_movies(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Movie) and sender is Review:
+        return  # the movie's own delete already enqueued it
+    jobs.enqueue('similar_movies', instance.pk if sender is Movie else instance.movie_id)
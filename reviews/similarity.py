@@ -0,0 +1,231 @@
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+from django.utils import timezone
+
+from .models import Movie, MovieSimilarity, Review
+
+# Wide enough that a catalogue's vocabulary (tens of thousands of words plus
+# director/genre tokens) rarely shares a column; the matrix is sparse.
+N_FEATURES = 2 ** 18
+TOP_K = 10
+CHUNK_SIZE = 256
+# The most frequent columns are multiplied as a dense block with BLAS; in a
+# sparse product every pair of documents sharing a common word costs a step.
+DENSE_FEATURES = 512
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,}')
+STOP_WORDS = frozenset(
+    'the and for are but not you all any can had her was one our out has him his '
+    'how its who did yes she too use that with have this will your from they been '
+    'were said each which their there what about would into than them then these '
+    'some could other after also just like more most over such only very when '
+    'where while film movie'.split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def movie_tokens(description, director, genre, review_texts=()):
+    tokens = tokenize(description)
+    for text in review_texts:
+        tokens.extend(tokenize(text))
+    if director:
+        tokens.append('director=' + '_'.join(director.lower().split()))
+    if genre:
+        tokens.append('genre=' + genre)
+    return tokens
+
+
+def tokens_hash(tokens):
+    return hashlib.sha1('\x00'.join(tokens).encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=2 ** 16)
+def _column(token):
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode('utf-8'))
+
+
+def _columns(tokens, n_features):
+    columns = np.fromiter(map(_column, tokens), dtype=np.int64, count=len(tokens))
+    return columns % n_features
+
+
+def vectorize(documents, n_features=N_FEATURES):
+    """Return an L2-normalised TF-IDF matrix of hashed token counts as a CSR matrix."""
+    n_docs = len(documents)
+    lengths = np.fromiter(map(len, documents), dtype=np.int64, count=n_docs)
+    rows = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+    columns = _columns([token for document in documents for token in document], n_features)
+    # Converting from COO sums the duplicate (row, column) entries into counts
+    matrix = sparse.coo_matrix(
+        (np.ones(len(columns), dtype=np.float32), (rows, columns)), shape=(n_docs, n_features)
+    ).tocsr()
+
+    np.log1p(matrix.data, out=matrix.data)
+    df = np.bincount(matrix.indices, minlength=n_features)
+    idf = np.log((1 + n_docs) / (1 + df)).astype(np.float32) + 1
+    matrix.data *= idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float32).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return matrix
+
+
+class _Similarities:
+    """Cosine similarities of blocks of rows against every row of ``matrix``."""
+
+    def __init__(self, matrix, dense_features=DENSE_FEATURES):
+        df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        frequent = np.zeros(matrix.shape[1], dtype=bool)
+        frequent[np.argsort(-df, kind='stable')[:dense_features]] = True
+        frequent &= df > 0
+
+        self.dense = matrix[:, np.flatnonzero(frequent)].toarray()
+        self.sparse = matrix.copy()
+        self.sparse.data[frequent[self.sparse.indices]] = 0
+        self.sparse.eliminate_zeros()
+        self.sparse_t = self.sparse.T.tocsr()
+
+    def __call__(self, block_rows):
+        sims = self.dense[block_rows] @ self.dense.T
+        sims += (self.sparse[block_rows] @ self.sparse_t).toarray()
+        return sims
+
+
+def top_k_neighbors(matrix, k=TOP_K, rows=None, chunk_size=CHUNK_SIZE):
+    """Return (indices, scores) of the k most cosine-similar rows for each of ``rows``.
+
+    Self-matches are excluded and rows are ordered by descending score.
+    """
+    n_docs = matrix.shape[0]
+    if rows is None:
+        rows = np.arange(n_docs)
+    rows = np.asarray(rows, dtype=np.int64)
+    k = max(0, min(k, n_docs - 1))
+
+    indices = np.empty((len(rows), k), dtype=np.int64)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    if not k:
+        return indices, scores
+
+    similarities = _Similarities(matrix)
+    for start in range(0, len(rows), chunk_size):
+        block_rows = rows[start:start + chunk_size]
+        sims = similarities(block_rows)
+        sims[np.arange(len(block_rows)), block_rows] = -np.inf
+
+        if k < n_docs - 1:
+            top = np.argpartition(sims, -k, axis=1)[:, -k:]
+        else:
+            top = np.argsort(sims, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+
+        indices[start:start + len(block_rows)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block_rows)] = np.take_along_axis(top_scores, order, axis=1)
+
+    return indices, scores
+
+
+def _beaten_rows(matrix, changed_rows, thresholds, chunk_size=CHUNK_SIZE):
+    """Return the rows for which some changed row now scores above ``thresholds``."""
+    best = np.full(matrix.shape[0], -np.inf, dtype=np.float32)
+    similarities = _Similarities(matrix)
+    for start in range(0, len(changed_rows), chunk_size):
+        block_rows = changed_rows[start:start + chunk_size]
+        sims = similarities(block_rows)
+        sims[np.arange(len(block_rows)), block_rows] = -np.inf
+        np.maximum(best, sims.max(axis=0), out=best)
+    return np.flatnonzero(best > thresholds)
+
+
+def rebuild(full=False, k=TOP_K, batch_size=500):
+    """Refresh stored neighbour lists and return a summary dict.
+
+    Unless ``full`` is set, only these movies are recomputed: movies whose
+    source text changed, movies whose stored neighbours include a changed or
+    deleted movie, and movies that a changed movie now beats their weakest
+    stored neighbour for (or that have fewer than ``k`` neighbours stored).
+    """
+    movies = list(Movie.objects.order_by('pk').values_list('pk', 'description', 'director', 'genre'))
+    review_texts = {}
+    for movie_id, title, content in Review.objects.order_by().values_list('movie_id', 'title', 'content').iterator():
+        review_texts.setdefault(movie_id, []).extend((title, content))
+
+    movie_ids = np.array([m[0] for m in movies], dtype=np.int64)
+    documents = [movie_tokens(desc, director, genre, review_texts.get(pk, ())) for pk, desc, director, genre in movies]
+    hashes = [tokens_hash(tokens) for tokens in documents]
+
+    existing = {
+        movie_id: (source_hash, np.frombuffer(neighbor_ids, dtype=np.int64), np.frombuffer(scores, dtype=np.float32))
+        for movie_id, source_hash, neighbor_ids, scores in MovieSimilarity.objects.values_list(
+            'movie_id', 'source_hash', 'neighbor_ids', 'scores'
+        ).iterator()
+    }
+
+    matrix = None
+    if full:
+        dirty = np.arange(len(movies))
+    else:
+        changed = np.array([
+            i for i, (pk, source_hash) in enumerate(zip(movie_ids.tolist(), hashes))
+            if pk not in existing or existing[pk][0] != source_hash
+        ], dtype=np.int64)
+        # Neighbour ids that are no longer live belong to deleted movies
+        valid_ids = np.setdiff1d(movie_ids, movie_ids[changed])
+        dirty = {
+            i for i, pk in enumerate(movie_ids.tolist())
+            if pk in existing and not np.isin(existing[pk][1], valid_ids).all()
+        }
+        dirty.update(changed.tolist())
+
+        if len(changed):
+            matrix = vectorize(documents)
+            # A changed movie enters a list when it beats that list's k-th score;
+            # lists that are not full yet take any positive match.
+            thresholds = np.zeros(len(movies), dtype=np.float32)
+            for i, pk in enumerate(movie_ids.tolist()):
+                if pk in existing and len(existing[pk][2]) >= k:
+                    thresholds[i] = existing[pk][2][-1]
+            dirty.update(_beaten_rows(matrix, changed, thresholds).tolist())
+        dirty = np.array(sorted(dirty), dtype=np.int64)
+
+    if len(dirty):
+        if matrix is None:
+            matrix = vectorize(documents)
+        indices, scores = top_k_neighbors(matrix, k=k, rows=dirty)
+    else:
+        indices = scores = np.empty((0, 0))
+
+    now = timezone.now()
+    records = []
+    for row, neighbors, neighbor_scores in zip(dirty.tolist(), indices, scores):
+        keep = neighbor_scores > 0
+        records.append(MovieSimilarity(
+            movie_id=int(movie_ids[row]),
+            neighbor_ids=movie_ids[neighbors[keep]].tobytes(),
+            scores=neighbor_scores[keep].astype(np.float32).tobytes(),
+            source_hash=hashes[row],
+            updated_at=now,
+        ))
+
+    # An upsert, so rows written by a concurrent rebuild (e.g. a manual
+    # build_similar_movies) are overwritten rather than raising IntegrityError
+    MovieSimilarity.objects.bulk_create(
+        records,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['movie'],
+        update_fields=['neighbor_ids', 'scores', 'source_hash', 'updated_at'],
+    )
+
+    return {'movies': len(movies), 'rebuilt': len(dirty)}
@@ -0,0 +1,119 @@
+"""
+Cold-start measurement for the WSGI application.
+
+The probe runs in a fresh interpreter so nothing the current process has
+already imported skews the numbers. Timing is done in a meta path hook rather
+than with ``-X importtime``, which misses modules loaded through
+``importlib.import_module`` (every app and models module Django loads).
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+PROBE = r'''
+import json
+import os
+import sys
+import time
+
+try:
+    _PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+    def rss_kb():
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    rss_kb()
+except (OSError, ValueError, AttributeError):
+    import resource
+
+    def rss_kb():
+        # Peak rather than current RSS, but still monotonic enough for deltas
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+modules = {}
+stack = []
+
+
+class _MeasuringLoader:
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        frame = {'children_us': 0}
+        stack.append(frame)
+        rss_before = rss_kb()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative_us = int((time.perf_counter() - started) * 1e6)
+            stack.pop()
+            if stack:
+                stack[-1]['children_us'] += cumulative_us
+            modules[module.__name__] = {
+                'self_us': cumulative_us - frame['children_us'],
+                'cumulative_us': cumulative_us,
+                'rss_kb': rss_kb() - rss_before,
+            }
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _MeasuringFinder:
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _MeasuringLoader(spec.loader)
+        return spec
+
+
+sys.meta_path.insert(0, _MeasuringFinder())
+started = time.perf_counter()
+
+import django
+from django.conf import settings
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+import_string(settings.WSGI_APPLICATION)
+# Workers resolve the URLconf on their first request; count it as start-up
+get_resolver().url_patterns
+
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'rss_kb': rss_kb(),
+    'modules': modules,
+}))
+'''
+
+
+def profile_startup():
+    """Load the WSGI application in a fresh interpreter and return its import profile.
+
+    The result has the total ``seconds`` and final ``rss_kb`` plus ``modules``,
+    a dict of module name -> {'self_us', 'cumulative_us', 'rss_kb'}.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'moviesite.settings'))
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,134 @@
+"""
+Per-user activity counters behind the profile page and /api/users/<id>/stats/.
+
+The signal handlers in reviews/signals.py apply each write as a delta. A
+user without a record yet, and every user touched by a cascading delete,
+gets a ``user_stats`` background job (reviews/jobs.py), which calls
+``rebuild``; ``manage.py rebuild_user_stats`` calls it too, for backfills or
+after bulk operations that bypass signals (bulk_create, QuerySet.update).
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import Comment, Movie, Rating, Review, UserStats
+
+
+def _update(user_id, apply, create=True):
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            # Signals fire after the write, so the rebuild will include it.
+            # Deletes never create a record: the user may be going away in the same cascade.
+            if create:
+                from . import jobs  # jobs imports this module for its handler
+                jobs.enqueue('user_stats', user_id)
+            return
+        apply(stats)
+        stats.save()
+
+
+def for_user(user):
+    """Return ``user``'s stats record, scheduling a rebuild if there is none yet.
+
+    Until the ``user_stats`` job has run the caller gets an unsaved, zeroed record.
+    """
+    record = UserStats.objects.filter(user=user).first()
+    if record is None:
+        from . import jobs  # jobs imports this module for its handler
+        jobs.enqueue('user_stats', user.pk)
+        record = UserStats(user=user)
+    return record
+
+
+def _movie_genre(movie_id):
+    return Movie.objects.filter(pk=movie_id).values_list('genre', flat=True).first()
+
+
+def rating_saved(rating, created):
+    old = getattr(rating, '_loaded_rating', None)
+    if not created and old == rating.rating:
+        return
+    genre = _movie_genre(rating.movie_id) if created else None
+
+    def apply(stats):
+        if created:
+            stats.rating_count += 1
+            stats.rating_sum += rating.rating
+            if genre:
+                stats.genre_counts[genre] = stats.genre_counts.get(genre, 0) + 1
+        else:
+            stats.rating_sum += rating.rating - (old or 0)
+        stats.last_activity = timezone.now()
+
+    _update(rating.user_id, apply)
+    rating._loaded_rating = rating.rating
+
+
+def rating_deleted(rating):
+    genre = _movie_genre(rating.movie_id)
+
+    def apply(stats):
+        stats.rating_count = max(stats.rating_count - 1, 0)
+        stats.rating_sum = max(stats.rating_sum - rating.rating, 0)
+        if genre and stats.genre_counts.get(genre):
+            stats.genre_counts[genre] -= 1
+            if not stats.genre_counts[genre]:
+                del stats.genre_counts[genre]
+
+    _update(rating.user_id, apply, create=False)
+
+
+def counter_changed(user_id, field, delta):
+    def apply(stats):
+        setattr(stats, field, max(getattr(stats, field) + delta, 0))
+        if delta > 0:
+            stats.last_activity = timezone.now()
+
+    _update(user_id, apply, create=delta > 0)
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    """Recompute stats records for ``user_ids`` (default: every user) and return how many were written."""
+    users = User.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    user_ids = list(users.values_list('pk', flat=True))
+
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        records = {pk: UserStats(user_id=pk, genre_counts={}) for pk in batch}
+
+        ratings = Rating.objects.filter(user_id__in=batch).order_by().values('user_id').annotate(
+            n=Count('pk'), total=Sum('rating'), last=Max('created_at'),
+        )
+        for row in ratings:
+            record = records[row['user_id']]
+            record.rating_count, record.rating_sum = row['n'], row['total']
+            record.last_activity = row['last']
+
+        genres = Rating.objects.filter(user_id__in=batch).order_by().values('user_id', 'movie__genre').annotate(n=Count('pk'))
+        for row in genres:
+            records[row['user_id']].genre_counts[row['movie__genre']] = row['n']
+
+        for model, field in ((Review, 'review_count'), (Comment, 'comment_count')):
+            rows = model.objects.filter(user_id__in=batch).order_by().values('user_id').annotate(
+                n=Count('pk'), last=Max('created_at'),
+            )
+            for row in rows:
+                record = records[row['user_id']]
+                setattr(record, field, row['n'])
+                if record.last_activity is None or row['last'] > record.last_activity:
+                    record.last_activity = row['last']
+
+        UserStats.objects.bulk_create(
+            records.values(),
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['rating_count', 'rating_sum', 'genre_counts', 'review_count', 'comment_count', 'last_activity'],
+        )
+        written += len(records)
+
+    return written
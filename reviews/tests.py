@@ -1,3 +1,450 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from moviesite.staticfiles import CompressedManifestStaticFilesStorage, StaticFilesASGI, StaticFilesWSGI, brotli
+
+from . import jobs, similarity, startup, stats
+from .models import Comment, Job, Movie, MovieSimilarity, Rating, Review, UserProfile, UserStats
+
+
+def make_movie(title, description, genre='drama', director='Someone'):
+    return Movie.objects.create(
+        title=title,
+        description=description,
+        genre=genre,
+        director=director,
+        release_date=datetime.date(2020, 1, 1),
+    )
+
+
+class SimilarityPipelineTests(TestCase):
+    def test_top_k_excludes_self_and_orders_by_score(self):
+        documents = [
+            similarity.tokenize('space station astronaut orbit rocket'),
+            similarity.tokenize('astronaut rocket orbit launch'),
+            similarity.tokenize('haunted house ghost midnight'),
+        ]
+        matrix = similarity.vectorize(documents)
+        indices, scores = similarity.top_k_neighbors(matrix, k=2)
+
+        self.assertEqual(indices[0, 0], 1)
+        self.assertEqual(indices[1, 0], 0)
+        self.assertNotIn(0, indices[0])
+        self.assertTrue(np.all(np.diff(scores, axis=1) <= 0))
+
+    def test_rebuild_is_incremental(self):
+        space = make_movie('Orbit', 'astronaut rocket orbit launch station', genre='sci-fi')
+        make_movie('Launch', 'astronaut rocket launch countdown', genre='sci-fi')
+        make_movie('Ghosts', 'haunted house ghost midnight scream', genre='horror', director='Else')
+
+        self.assertEqual(similarity.rebuild()['rebuilt'], 3)
+        self.assertEqual(similarity.rebuild()['rebuilt'], 0)
+
+        Review.objects.create(
+            movie=space, user=User.objects.create_user('critic'), title='Great', content='loved the rocket'
+        )
+        # Orbit changed, and Launch lists Orbit as a neighbour; Ghosts shares nothing with either
+        self.assertEqual(similarity.rebuild()['rebuilt'], 2)
+        self.assertEqual(similarity.rebuild(full=True)['rebuilt'], 3)
+
+    def test_rebuild_drops_deleted_movies(self):
+        orbit = make_movie('Orbit', 'astronaut rocket orbit launch station', genre='sci-fi')
+        launch = make_movie('Launch', 'astronaut rocket launch countdown', genre='sci-fi')
+        station = make_movie('Station', 'astronaut station orbit docking', genre='sci-fi')
+        similarity.rebuild()
+
+        launch.delete()
+        similarity.rebuild()
+
+        self.assertEqual(MovieSimilarity.objects.get(movie=orbit).neighbor_id_list(), [station.pk])
+        self.assertEqual(MovieSimilarity.objects.get(movie=station).neighbor_id_list(), [orbit.pk])
+
+    def test_rebuild_adds_new_movie_to_existing_lists(self):
+        orbit = make_movie('Orbit', 'astronaut rocket orbit launch station', genre='sci-fi')
+        make_movie('Ghosts', 'haunted house ghost midnight scream', genre='horror', director='Else')
+        make_movie('Harbour', 'fishing boat harbour storm sailor', director='Other')
+        similarity.rebuild(k=1)
+        self.assertEqual(MovieSimilarity.objects.get(movie=orbit).neighbor_id_list(), [])
+
+        twin = make_movie('Orbit II', 'astronaut rocket orbit launch station', genre='sci-fi')
+        result = similarity.rebuild(k=1)
+
+        self.assertEqual(result['rebuilt'], 2)
+        self.assertEqual(MovieSimilarity.objects.get(movie=orbit).neighbor_id_list(), [twin.pk])
+
+    def test_movie_detail_shows_similar_movies(self):
+        orbit = make_movie('Orbit', 'astronaut rocket orbit launch station', genre='sci-fi')
+        launch = make_movie('Launch', 'astronaut rocket launch countdown', genre='sci-fi')
+        similarity.rebuild()
+
+        self.assertEqual(MovieSimilarity.objects.get(movie=orbit).neighbor_id_list(), [launch.pk])
+        response = self.client.get(reverse('movie_detail', args=[orbit.pk]))
+        self.assertContains(response, 'More Like This')
+        self.assertEqual(response.context['similar_movies'], [launch])
+
+
+# What the settings select when DJANGO_CACHE_BACKEND names a shared cache
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', USER_CACHE_TIMEOUT=300)
+class CachedSessionAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.client.get(reverse('home'))
+
+    def test_logged_in_request_skips_session_and_user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        tables = ' '.join(q['sql'] for q in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('FROM "auth_user"', tables)
+
+    def test_profile_change_invalidates_cached_user(self):
+        UserProfile.objects.create(user=self.user, bio='first')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['user'].profile.bio, 'first')
+
+        UserProfile.objects.filter(user=self.user).update(bio='stale')
+        self.user.profile.bio = 'second'
+        self.user.profile.save()
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['user'].profile.bio, 'second')
+
+    def test_register_logs_in_through_cached_backend(self):
+        client = self.client_class()
+        response = client.post(reverse('register'), {
+            'username': 'newcomer', 'email': 'newcomer@example.com',
+            'password1': 'Tricky-pass-4821', 'password2': 'Tricky-pass-4821',
+        })
+        self.assertRedirects(response, reverse('home'))
+        self.assertEqual(client.session['_auth_user_backend'], 'reviews.backends.CachedModelBackend')
+        user = User.objects.get(username='newcomer')
+        self.assertEqual(client.session['_auth_user_id'], str(user.pk))
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_anonymous_get_has_no_session_side_effects(self):
+        client = self.client_class()
+        response = client.get(reverse('home'))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertIn('Cookie', response.headers['Vary'])
+
+
+class DefaultSessionAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+    def other_worker(self):
+        client = self.client_class()
+        client.cookies[settings.SESSION_COOKIE_NAME] = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        return client
+
+    def test_process_local_cache_keeps_sessions_and_users_uncached(self):
+        self.assertEqual(settings.SESSION_ENGINE, 'django.contrib.sessions.backends.db')
+        self.assertIsNone(settings.USER_CACHE_TIMEOUT)
+
+    def test_logout_invalidates_session_for_every_worker(self):
+        other_worker = self.other_worker()
+        self.assertEqual(other_worker.get(reverse('profile')).status_code, 200)
+
+        self.client.post(reverse('logout'))
+        response = other_worker.get(reverse('profile'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('profile')}")
+
+    def test_deactivation_applies_without_signals(self):
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 302)
+
+    def test_session_from_replaced_backend_stays_logged_in(self):
+        client = self.client_class()
+        client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(client.get(reverse('profile')).status_code, 200)
+        self.assertEqual(client.session['_auth_user_backend'], 'reviews.backends.CachedModelBackend')
+
+
+MANIFEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'moviesite.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=MANIFEST_STORAGES)
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+
+    def test_uncollected_asset_fails_only_outside_debug(self):
+        storage = CompressedManifestStaticFilesStorage(location=self.static_root)
+        with self.assertRaises(ValueError):
+            storage.url('css/missing.css')
+        with override_settings(DEBUG=True):
+            self.assertEqual(storage.url('css/missing.css'), settings.STATIC_URL + 'css/missing.css')
+
+    def test_repeat_page_loads_need_no_static_revalidation(self):
+        with override_settings(STATIC_ROOT=self.static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            html = self.client.get(reverse('home')).content.decode()
+            app = StaticFilesWSGI(lambda environ, start_response: [], self.static_root, settings.STATIC_URL)
+
+        urls = re.findall(r'(?:href|src)="(%s[^"]+)"' % re.escape(settings.STATIC_URL), html)
+        self.assertTrue(urls)
+        for url in urls:
+            self.assertRegex(url, r'\.[0-9a-f]{12}\.\w+$')
+            status, headers, body = self.wsgi_get(app, url, HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(status, '200 OK')
+            # Browsers reuse immutable responses without a conditional request
+            self.assertEqual(headers['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(headers['Content-Encoding'], 'br' if brotli else 'gzip')
+            self.assertEqual(int(headers['Content-Length']), len(body))
+
+    def write_asset(self, name, data):
+        storage = CompressedManifestStaticFilesStorage(location=self.static_root)
+        with open(os.path.join(self.static_root, name), 'wb') as f:
+            f.write(data)
+        storage.compress(name)
+
+    def test_encodings_refused_with_q_zero_are_not_served(self):
+        self.write_asset('app.js', b'console.log("hello");\n' * 100)
+        app = StaticFilesWSGI(lambda environ, start_response: [], self.static_root, '/static/')
+
+        _, headers, _ = self.wsgi_get(app, '/static/app.js', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertNotIn('Content-Encoding', headers)
+        _, headers, _ = self.wsgi_get(app, '/static/app.js', HTTP_ACCEPT_ENCODING='br;q=0, *;q=0.5')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+
+    def test_asgi_streams_file(self):
+        data = b'body { color: black; }\n' * 10000
+        self.write_asset('site.css', data)
+        app = StaticFilesASGI(None, self.static_root, '/static/')
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/static/site.css', 'headers': []}
+        asyncio.run(app(scope, None, send))
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual(b''.join(m['body'] for m in messages[1:]), data)
+
+    @staticmethod
+    def wsgi_get(app, path, **environ):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(app({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **environ}, start_response))
+        return response['status'], response['headers'], body
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('commenter')
+        self.movie = make_movie('Talky', 'people talk a lot')
+        self.review = Review.objects.create(movie=self.movie, user=self.user, title='Hot take', content='...')
+        self.comments = [
+            Comment.objects.create(review=self.review, user=self.user, content=f'comment {i}') for i in range(25)
+        ]
+
+    def test_comment_count_tracks_creates_and_deletes(self):
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.comment_count, 25)
+        self.comments[0].delete()
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.comment_count, 24)
+
+    def test_movie_detail_renders_only_preview_comments(self):
+        response = self.client.get(reverse('movie_detail', args=[self.movie.pk]))
+        self.assertContains(response, 'Comments (25)')
+        self.assertContains(response, 'class="comment"', count=3)
+        self.assertContains(response, f'?after={self.comments[2].pk}')
+
+    def test_comments_api_pages_by_keyset(self):
+        url = reverse('api_review_comments', args=[self.review.pk])
+        page = self.client.get(url, {'after': self.comments[2].pk}).json()
+        self.assertEqual(page['results'][0]['content'], 'comment 3')
+        self.assertEqual(len(page['results']), 20)
+
+        page = self.client.get(page['next']).json()
+        self.assertEqual([c['content'] for c in page['results']], ['comment 23', 'comment 24'])
+        self.assertIsNone(page['next'])
+
+    def test_comments_api_404_for_unknown_review(self):
+        response = self.client.get(reverse('api_review_comments', args=[self.review.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class StartupTests(SimpleTestCase):
+    # Generous enough for a loaded CI box; a cold start currently takes ~0.35s
+    BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', '1.5'))
+
+    def test_cold_start_stays_within_budget(self):
+        profile = startup.profile_startup()
+        self.assertLess(profile['seconds'], self.BUDGET_SECONDS)
+        # The DRF stack and Pillow are only needed once the API or an image is used
+        for module in ('rest_framework.generics', 'rest_framework.serializers', 'reviews.api', 'PIL'):
+            self.assertNotIn(module, profile['modules'])
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rater')
+        self.drama = make_movie('Tears', 'sad story', genre='drama')
+        self.comedy = make_movie('Laughs', 'funny story', genre='comedy')
+
+    def assertStatsMatchRebuild(self):
+        incremental = UserStats.objects.get(user=self.user)
+        stats.rebuild([self.user.pk])
+        rebuilt = UserStats.objects.get(user=self.user)
+        for field in ('rating_count', 'rating_sum', 'genre_counts', 'review_count', 'comment_count'):
+            self.assertEqual(getattr(incremental, field), getattr(rebuilt, field), field)
+        return rebuilt
+
+    def test_writes_are_applied_as_deltas(self):
+        Rating.objects.create(movie=self.drama, user=self.user, rating=8)
+        # There is no record to apply the first write to; the user_stats job builds it
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+        jobs.run_pending()
+
+        Rating.objects.update_or_create(movie=self.comedy, user=self.user, defaults={'rating': 4})
+        rating, _ = Rating.objects.update_or_create(movie=self.comedy, user=self.user, defaults={'rating': 6})
+        review = Review.objects.create(movie=self.drama, user=self.user, title='Sad', content='...')
+        Comment.objects.create(review=review, user=self.user, content='agreed')
+        rating.delete()
+
+        self.assertFalse(Job.objects.filter(kind='user_stats', status=Job.PENDING).exists())
+        record = self.assertStatsMatchRebuild()
+        self.assertEqual(record.rating_count, 1)
+        self.assertEqual(record.mean_rating(), 8)
+        self.assertEqual(record.genre_counts, {'drama': 1})
+        self.assertEqual((record.review_count, record.comment_count), (1, 1))
+        self.assertIsNotNone(record.last_activity)
+
+    def test_movie_delete_rebuilds_each_user_once(self):
+        raters = [User.objects.create_user(f'rater{i}') for i in range(5)]
+        for user in raters:
+            review = Review.objects.create(movie=self.drama, user=user, title='Meh', content='...')
+            Rating.objects.create(movie=self.drama, user=user, rating=5)
+            Rating.objects.create(movie=self.comedy, user=user, rating=9)
+            Comment.objects.create(review=review, user=self.user, content='no')
+        jobs.run_pending()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.drama.delete()
+        self.assertNotIn('reviews_userstats', ' '.join(q['sql'] for q in queries))
+        self.assertEqual(Job.objects.filter(kind='user_stats', status=Job.PENDING).count(), 6)
+
+        jobs.run_pending()
+        record = UserStats.objects.get(user=raters[0])
+        self.assertEqual((record.rating_count, record.rating_sum, record.review_count), (1, 9, 0))
+        self.assertEqual(record.genre_counts, {'comedy': 1})
+        self.assertEqual(UserStats.objects.get(user=self.user).comment_count, 0)
+
+    def test_missing_record_is_scheduled_on_read(self):
+        self.assertEqual(self.client.get(reverse('api_user_stats', args=[self.user.pk])).json()['rating_count'], 0)
+        self.assertTrue(Job.objects.filter(kind='user_stats', key=str(self.user.pk), status=Job.PENDING).exists())
+
+    def test_profile_paginates_and_reads_stats(self):
+        for i in range(25):
+            movie = make_movie(f'Movie {i}', 'filler')
+            Rating.objects.create(movie=movie, user=self.user, rating=5)
+        jobs.run_pending()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('profile'), {'ratings_page': 2})
+        self.assertEqual(response.context['stats'].rating_count, 25)
+        self.assertEqual(len(response.context['user_ratings']), 5)
+
+    def test_stats_api(self):
+        Rating.objects.create(movie=self.drama, user=self.user, rating=7)
+        jobs.run_pending()
+        data = self.client.get(reverse('api_user_stats', args=[self.user.pk])).json()
+        self.assertEqual(data['rating_count'], 1)
+        self.assertEqual(data['mean_rating'], 7.0)
+        self.assertEqual(data['genre_counts'], {'drama': 1})
+        self.assertEqual(self.client.get(reverse('api_user_stats', args=[self.user.pk + 1])).status_code, 404)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('burst')
+        self.movies = [make_movie(f'Movie {i}', 'filler') for i in range(5)]
+        Job.objects.all().delete()
+
+    def test_write_burst_coalesces_into_one_job(self):
+        for movie in self.movies:
+            Rating.objects.create(movie=movie, user=self.user, rating=6)
+        self.assertEqual(Job.objects.filter(kind='user_stats', status=Job.PENDING).count(), 1)
+
+        handler = mock.Mock()
+        with mock.patch.dict(jobs.HANDLERS, {'user_stats': handler}):
+            self.assertEqual(jobs.run_batch('user_stats'), 1)
+        handler.assert_called_once_with([str(self.user.pk)])
+
+    def test_similar_movies_jobs_are_keyed_by_movie(self):
+        Review.objects.create(movie=self.movies[1], user=self.user, title='Hm', content='...')
+        keys = set(Job.objects.filter(kind='similar_movies', status=Job.PENDING).values_list('key', flat=True))
+        self.assertEqual(keys, {str(self.movies[1].pk)})
+
+    def test_similar_movies_jobs_wait_out_the_debounce_and_never_overlap(self):
+        jobs.enqueue('similar_movies', self.movies[0].pk)
+        handler = mock.Mock()
+        with mock.patch.dict(jobs.HANDLERS, {'similar_movies': handler}):
+            self.assertEqual(jobs.run_batch('similar_movies'), 0)
+
+            Job.objects.update(run_after=timezone.now())
+            Job.objects.create(kind='similar_movies', key='other', status=Job.RUNNING, worker='elsewhere')
+            self.assertEqual(jobs.run_batch('similar_movies'), 0)
+
+            Job.objects.filter(worker='elsewhere').update(status=Job.DONE)
+            self.assertEqual(jobs.run_batch('similar_movies'), 1)
+        handler.assert_called_once_with([str(self.movies[0].pk)])
+
+    def test_only_jobs_without_a_recent_heartbeat_are_requeued(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        alive = Job.objects.create(
+            kind='user_stats', key='1', status=Job.RUNNING, started_at=long_ago, heartbeat_at=timezone.now(),
+        )
+        dead = Job.objects.create(kind='user_stats', key='2', status=Job.RUNNING, started_at=long_ago, heartbeat_at=long_ago)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        alive.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual((alive.status, dead.status), (Job.RUNNING, Job.PENDING))
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        jobs.enqueue('user_stats', self.user.pk)
+        with mock.patch.dict(jobs.HANDLERS, {'user_stats': mock.Mock(side_effect=RuntimeError('boom'))}):
+            jobs.run_batch('user_stats')
+
+        job = Job.objects.get(kind='user_stats')
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        # Not due yet, so nothing is claimed
+        self.assertEqual(jobs.run_batch('user_stats'), 0)
+
+    def test_metrics_report_latency_and_throughput(self):
+        Rating.objects.create(movie=self.movies[0], user=self.user, rating=6)
+        jobs.run_pending()
+        metrics = jobs.metrics()['user_stats']
+        self.assertEqual((metrics['pending'], metrics['done']), (0, 1))
+        self.assertIsNotNone(metrics['mean_latency_seconds'])
+        self.assertGreater(metrics['jobs_per_minute'], 0)
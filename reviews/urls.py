@@ -1,7 +1,23 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
 from . import views
 
+
+def lazy_api_view(name):
+    """Resolve ``reviews.api.<name>`` on first call so DRF is only imported when the API is used."""
+    resolved = []
+
+    @csrf_exempt  # DRF views do their own CSRF enforcement
+    def view(request, *args, **kwargs):
+        if not resolved:
+            target = import_string(f'reviews.api.{name}')
+            resolved.append(target.as_view() if hasattr(target, 'as_view') else target)
+        return resolved[0](request, *args, **kwargs)
+
+    return view
+
 urlpatterns = [
     # Main pages
     path('', views.home, name='home'),
@@ -25,9 +41,12 @@ urlpatterns = [
     path('recommendations/', views.recommendations, name='recommendations'),
 
     # API endpoints
-    path('api/movies/', views.MovieListAPI.as_view(), name='api_movie_list'),
-    path('api/movies/<int:pk>/', views.MovieDetailAPI.as_view(), name='api_movie_detail'),
-    path('api/ratings/', views.RatingListAPI.as_view(), name='api_rating_list'),
-    path('api/reviews/', views.ReviewListAPI.as_view(), name='api_review_list'),
-    path('api/top-rated/', views.top_rated_api, name='api_top_rated'),
+    path('api/movies/', lazy_api_view('MovieListAPI'), name='api_movie_list'),
+    path('api/movies/<int:pk>/', lazy_api_view('MovieDetailAPI'), name='api_movie_detail'),
+    path('api/ratings/', lazy_api_view('RatingListAPI'), name='api_rating_list'),
+    path('api/reviews/', lazy_api_view('ReviewListAPI'), name='api_review_list'),
+    path('api/reviews/<int:review_id>/comments/', lazy_api_view('ReviewCommentListAPI'), name='api_review_comments'),
+    path('api/users/<int:user_id>/stats/', lazy_api_view('UserStatsAPI'), name='api_user_stats'),
+    path('api/top-rated/', lazy_api_view('top_rated_api'), name='api_top_rated'),
+    path('api/jobs/metrics/', lazy_api_view('job_metrics_api'), name='api_job_metrics'),
 ]
@@ -2,8 +2,10 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Avg, Count
-from .models import Movie, Rating, Review, Comment, UserProfile
+from django.core.paginator import Paginator
+from django.db.models import Avg, Count, Prefetch
+from . import stats
+from .models import Movie, MovieSimilarity, Rating, Review, Comment, UserProfile
 from .forms import UserRegisterForm, UserProfileForm, MovieForm, RatingForm, ReviewForm, CommentForm
 
 def home(request):
@@ -66,6 +68,9 @@ def register(request):
     return render(request, 'reviews/register.html', {'form': form})
 
 
+PROFILE_PAGE_SIZE = 20
+
+
 @login_required
 def profile(request):
     profile, created = UserProfile.objects.get_or_create(user=request.user)
@@ -79,11 +84,18 @@ def profile(request):
     else:
         form = UserProfileForm(instance=profile)
 
-    user_reviews = Review.objects.filter(user=request.user).select_related('movie')
-    user_ratings = Rating.objects.filter(user=request.user).select_related('movie')
+    user_stats = stats.for_user(request.user)
+
+    user_reviews = Paginator(
+        Review.objects.filter(user=request.user).select_related('movie'), PROFILE_PAGE_SIZE
+    ).get_page(request.GET.get('reviews_page'))
+    user_ratings = Paginator(
+        Rating.objects.filter(user=request.user).select_related('movie'), PROFILE_PAGE_SIZE
+    ).get_page(request.GET.get('ratings_page'))
 
     context = {
         'form': form,
+        'stats': user_stats,
         'user_reviews': user_reviews,
         'user_ratings': user_ratings,
     }
@@ -111,18 +123,35 @@ def movie_list(request):
     return render(request, 'reviews/movie_list.html', context)
 
 
+COMMENT_PREVIEW_COUNT = 3
+
+
 def movie_detail(request, pk):
     movie = get_object_or_404(Movie, pk=pk)
-    reviews = movie.reviews.select_related('user').all()
+    # Only the first few comments per review; the rest load from the comments API
+    reviews = movie.reviews.select_related('user').prefetch_related(Prefetch(
+        'comments',
+        queryset=Comment.objects.select_related('user').order_by('id')[:COMMENT_PREVIEW_COUNT],
+        to_attr='preview_comments',
+    ))
     user_rating = None
 
     if request.user.is_authenticated:
         user_rating = Rating.objects.filter(movie=movie, user=request.user).first()
 
+    # Похожие фильмы: списки соседей заранее считает build_similar_movies
+    similar_movies = []
+    similarity = MovieSimilarity.objects.filter(movie=movie).only('neighbor_ids').first()
+    if similarity:
+        neighbor_ids = similarity.neighbor_id_list()
+        by_id = Movie.objects.in_bulk(neighbor_ids)
+        similar_movies = [by_id[pk] for pk in neighbor_ids if pk in by_id]
+
     context = {
         'movie': movie,
         'reviews': reviews,
         'user_rating': user_rating,
+        'similar_movies': similar_movies,
     }
     return render(request, 'reviews/movie_detail.html', context)
 
@@ -209,41 +238,6 @@ def top_rated(request):
     return render(request, 'reviews/top_rated.html', context)
 
 
-from rest_framework import generics
-from rest_framework.response import Response
-from rest_framework.decorators import api_view
-from .serializers import MovieSerializer, RatingSerializer, ReviewSerializer
-
-
-class MovieListAPI(generics.ListCreateAPIView):
-    queryset = Movie.objects.all()
-    serializer_class = MovieSerializer
-
-
-class MovieDetailAPI(generics.RetrieveAPIView):
-    queryset = Movie.objects.all()
-    serializer_class = MovieSerializer
-
-
-class RatingListAPI(generics.ListCreateAPIView):
-    queryset = Rating.objects.all()
-    serializer_class = RatingSerializer
-
-
-class ReviewListAPI(generics.ListCreateAPIView):
-    queryset = Review.objects.all()
-    serializer_class = ReviewSerializer
-
-
-@api_view(['GET'])
-def top_rated_api(request):
-    movies = Movie.objects.annotate(
-        avg_rating=Avg('ratings__rating')
-    ).order_by('-avg_rating')[:10]
-
-    serializer = MovieSerializer(movies, many=True)
-    return Response(serializer.data)
-
 @login_required
 def recommendations(request):
     user_ratings = Rating.objects.filter(user=request.user).select_related('movie')
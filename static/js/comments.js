@@ -0,0 +1,36 @@
+// Loads the rest of a review's comments from /api/reviews/<id>/comments/.
+document.addEventListener('click', async (event) => {
+    const button = event.target.closest('.load-comments');
+    if (!button || button.disabled) {
+        return;
+    }
+
+    button.disabled = true;
+    const list = button.parentElement.querySelector('.comment-list');
+
+    try {
+        const response = await fetch(button.dataset.url, {headers: {Accept: 'application/json'}});
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+        const page = await response.json();
+
+        for (const comment of page.results) {
+            const item = document.createElement('div');
+            const author = document.createElement('strong');
+            item.className = 'comment';
+            author.textContent = comment.user + ':';
+            item.append(author, ' ' + comment.content);
+            list.append(item);
+        }
+
+        if (page.next) {
+            button.dataset.url = page.next;
+            button.disabled = false;
+        } else {
+            button.remove();
+        }
+    } catch (error) {
+        button.disabled = false;
+    }
+});